@@ -15,12 +15,34 @@ public class SegmentLoader : MonoBehaviour
         public string line;
     }
 
+    [Serializable]
+    public class AudioIndexLine
+    {
+        public int index;
+        public string character;
+        public string line;
+        public long byteOffset;
+        public long byteLength;
+        public float start;
+        public float end;
+    }
+
+    // Present when the segment was generated with AudioCreator --stitched
+    [Serializable]
+    public class AudioIndex
+    {
+        public string file;
+        public int sampleRate;
+        public AudioIndexLine[] lines;
+    }
+
     [Serializable]
     public class SegmentMetadata
     {
         public string mainTitle;
         public string[] characters;
         public DialogueLine[] dialogue;
+        public AudioIndex audioIndex;
     }
 
     [SerializeField] private string absoluteBasePath;
@@ -127,6 +149,21 @@ public class SegmentLoader : MonoBehaviour
         // Dictionary to store loaded audio clips
         Dictionary<string, AudioClip> audioClips = new Dictionary<string, AudioClip>();
 
+        // One stitched file per segment: load it once and cut the lines out by their time offsets
+        if (metadata.audioIndex != null && !string.IsNullOrEmpty(metadata.audioIndex.file))
+        {
+            string stitchedPath = Path.Combine(segmentPath, metadata.audioIndex.file);
+            if (File.Exists(stitchedPath))
+            {
+                yield return StartCoroutine(LoadStitchedAudio(stitchedPath, metadata.audioIndex));
+                Debug.Log($"Successfully loaded segment: {segmentName} with {currentSegment.GetRemainingLineCount()} lines");
+
+                SegmentLoaded?.Invoke();
+                yield break;
+            }
+            Debug.LogWarning($"Stitched audio not found: {stitchedPath}, falling back to per-line files");
+        }
+
         // Audio folder path
         string audioFolderPath = Path.Combine(segmentPath, "audio");
 
@@ -187,6 +224,51 @@ public class SegmentLoader : MonoBehaviour
         SegmentLoaded?.Invoke();
     }
 
+    private IEnumerator LoadStitchedAudio(string audioPath, AudioIndex audioIndex)
+    {
+        AudioClip broadcast = null;
+        using (UnityWebRequest audioRequest = UnityWebRequestMultimedia.GetAudioClip("file://" + audioPath, GetAudioType(Path.GetExtension(audioPath))))
+        {
+            yield return audioRequest.SendWebRequest();
+
+            if (audioRequest.result == UnityWebRequest.Result.Success)
+                broadcast = DownloadHandlerAudioClip.GetContent(audioRequest);
+            else
+                Debug.LogWarning($"Failed to load audio file {audioPath}: {audioRequest.error}");
+        }
+
+        float[] samples = null;
+        if (broadcast != null)
+        {
+            samples = new float[broadcast.samples * broadcast.channels];
+            broadcast.GetData(samples, 0);
+        }
+
+        foreach (AudioIndexLine indexLine in audioIndex.lines)
+        {
+            AudioClip audioClip = null;
+            if (samples != null)
+            {
+                int channels = broadcast.channels;
+                int startSample = Mathf.Clamp(Mathf.RoundToInt(indexLine.start * broadcast.frequency), 0, broadcast.samples - 1);
+                int endSample = Mathf.Clamp(Mathf.RoundToInt(indexLine.end * broadcast.frequency), startSample + 1, broadcast.samples);
+                int length = endSample - startSample;
+
+                float[] slice = new float[length * channels];
+                Array.Copy(samples, startSample * channels, slice, 0, slice.Length);
+
+                audioClip = AudioClip.Create($"{indexLine.index}_{indexLine.character}", length, channels, broadcast.frequency, false);
+                audioClip.SetData(slice, 0);
+            }
+            else
+            {
+                Debug.LogWarning($"Audio not found for {indexLine.index}_{indexLine.character}");
+            }
+
+            currentSegment.newsLines.Enqueue(new NewsLine(audioClip, indexLine.line, indexLine.character));
+        }
+    }
+
     // Helper method to determine AudioType from file extension
     private AudioType GetAudioType(string extension)
     {
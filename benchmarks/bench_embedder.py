@@ -0,0 +1,130 @@
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import resource
+from datetime import datetime
+
+import numpy as np
+
+# The pipeline modules import each other as top-level modules from src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import Models
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+MIN_AGREEMENT = 0.99  # mean cosine similarity the ONNX backend must reach against PyTorch
+
+WORDS = [
+    "senate", "election", "court", "ruling", "storm", "wildfire", "market", "stocks", "tariff", "trade",
+    "president", "governor", "strike", "union", "vaccine", "hospital", "war", "ceasefire", "border", "police",
+]
+
+"""
+Checks the ONNX embedding backend against the PyTorch SentenceTransformer it replaces:
+
+    python3 benchmarks/bench_embedder.py --titles-from database/autonews.db
+
+Reports the cosine agreement of the two backends on the same titles, their
+throughput in titles per second, and how much each one adds to the process
+(load time and resident memory). Exits non-zero if the agreement is below 0.99.
+"""
+
+
+def load_titles(db_path, count):
+    if db_path:
+        conn = sqlite3.connect(db_path)
+        titles = [row[0] for row in conn.execute('SELECT title FROM articles LIMIT ?', (count,))]
+        conn.close()
+        if titles:
+            return titles
+        print(f"No titles found in {db_path}, using synthetic ones")
+    rand = random.Random(42)
+    return [" ".join(rand.choice(WORDS) for _ in range(rand.randint(5, 12))).capitalize() for _ in range(count)]
+
+
+def max_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def bench_backend(name, loader, titles, batch_size, repeat):
+    rss_before = max_rss_mb()
+    start = time.perf_counter()
+    embedder = loader()
+    load_seconds = time.perf_counter() - start
+
+    embedder.encode(titles[:batch_size], batch_size=batch_size)  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        embeddings = embedder.encode(titles, batch_size=batch_size)
+    seconds = (time.perf_counter() - start) / repeat
+
+    result = {
+        "load_seconds": round(load_seconds, 3),
+        "titles_per_second": round(len(titles) / seconds, 1),
+        "single_title_ms": round(bench_single(embedder, titles) * 1000, 3),
+        "rss_growth_mb": round(max_rss_mb() - rss_before, 1),
+    }
+    print(f"{name:6} load {result['load_seconds']:6.2f}s  {result['titles_per_second']:9.1f} titles/s  "
+          f"{result['single_title_ms']:7.2f} ms/title  +{result['rss_growth_mb']:.0f} MB")
+    return np.asarray(embeddings), result
+
+
+def bench_single(embedder, titles, calls=100):
+    # ingest embeds one title per call, so the unbatched latency matters as much as throughput
+    start = time.perf_counter()
+    for title in titles[:calls]:
+        embedder.encode(title)
+    return (time.perf_counter() - start) / min(calls, len(titles))
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Compare the ONNX and PyTorch embedding backends")
+    parser.add_argument("--titles-from", help="Take titles from an existing autonews.db instead of synthetic ones")
+    parser.add_argument("--count", type=int, default=2000, help="Number of titles to embed")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=3)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    titles = load_titles(args.titles_from, args.count)
+    onnx_config = Models.load_embedding_config().get("onnx") or {}
+
+    # ONNX first, so its memory figure isn't hidden under torch's
+    onnx_embeddings, onnx_result = bench_backend("onnx", lambda: Models.load_onnx_embedder(onnx_config), titles, args.batch_size, args.repeat)
+    torch_embeddings, torch_result = bench_backend("torch", Models.load_torch_embedder, titles, args.batch_size, args.repeat)
+
+    # both outputs are L2 normalised, so the row-wise dot product is the cosine similarity
+    agreement = np.sum(onnx_embeddings * torch_embeddings, axis=1)
+    report = {
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "titles": len(titles),
+        "onnx": onnx_result,
+        "torch": torch_result,
+        "speedup": round(onnx_result["titles_per_second"] / torch_result["titles_per_second"], 2),
+        "cosine_agreement": {
+            "mean": round(float(agreement.mean()), 5),
+            "min": round(float(agreement.min()), 5),
+            "p01": round(float(np.percentile(agreement, 1)), 5),
+        },
+    }
+    print(f"Cosine agreement: mean {report['cosine_agreement']['mean']}, min {report['cosine_agreement']['min']}")
+    print(f"Speed-up: {report['speedup']}x")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results_path = os.path.join(RESULTS_DIR, f"embedder-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(results_path, "w") as out:
+        json.dump(report, out, indent=4)
+    print(f"Results written to {results_path}")
+
+    if report["cosine_agreement"]["mean"] < MIN_AGREEMENT:
+        print(f"ONNX backend disagrees with PyTorch (mean cosine below {MIN_AGREEMENT})")
+        sys.exit(1)
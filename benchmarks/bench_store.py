@@ -0,0 +1,235 @@
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# The pipeline modules import each other as top-level modules from src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import ArticleIngest
+import ScrapeArticle
+from GoogleFormsUpdater import createClusters
+from Models import get_embedding_model, get_nlp
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_SIZES = [1000, 10000, 100000]
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2
+SYNTHETIC_TOPICS = 200  # cluster centres the synthetic embeddings are drawn around
+INSERT_BATCH = 5000
+REGRESSION_RATIO = 1.2  # slower than the baseline by more than this counts as a regression
+
+WORDS = [
+    "senate", "election", "court", "ruling", "storm", "wildfire", "market", "stocks", "tariff", "trade",
+    "president", "governor", "strike", "union", "vaccine", "hospital", "war", "ceasefire", "border", "police",
+    "budget", "bill", "inflation", "rates", "bank", "energy", "climate", "flood", "school", "protest",
+]
+SOURCES = list(ScrapeArticle.SOURCES)
+
+"""
+Times the hot paths of the article store against synthetic databases in the
+`articles` schema, from 1k rows up to 1M:
+
+    python3 benchmarks/bench_store.py --sizes 1000,10000,100000,1000000
+    python3 benchmarks/bench_store.py --compare benchmarks/results/<earlier run>.json
+
+Each size gets its own database in a temporary folder. createClusters and
+fetch_top_article_by_embeddings scan the whole table, so they are timed once per
+size; extract_topics and insert_article work per article, so they are timed over
+a sample of calls. Every function is run a second time under tracemalloc for its
+peak memory. Results are saved under benchmarks/results/ for later comparison.
+Note that the embeddings are stored as JSON text, so 1M rows take several GB of disk.
+"""
+
+
+def synthetic_rows(count, replay=None, seed=42):
+    """Yields (title, link, published_at, topics, embedding) rows, either random or replayed from a real database."""
+    rng = np.random.default_rng(seed)
+    rand = random.Random(seed)
+    centres = rng.normal(size=(SYNTHETIC_TOPICS, EMBEDDING_DIM))
+    start = datetime(2025, 4, 1)
+
+    for i in range(count):
+        if replay:
+            title, embedding_json = replay[rand.randrange(len(replay))]
+        else:
+            title = " ".join(rand.choice(WORDS) for _ in range(rand.randint(5, 12))).capitalize()
+            embedding = centres[rand.randrange(SYNTHETIC_TOPICS)] + rng.normal(scale=0.6, size=EMBEDDING_DIM)
+            embedding /= np.linalg.norm(embedding)
+            embedding_json = json.dumps(embedding.tolist())
+
+        source = SOURCES[i % len(SOURCES)]
+        link = f"https://www.{source}.com/article/{i}"
+        published_at = (start + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S")
+        topics = ", ".join(title.split()[:3])
+        yield title, link, published_at, topics, embedding_json
+
+
+def load_replay(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute('SELECT title, embedding FROM articles WHERE embedding IS NOT NULL').fetchall()
+    conn.close()
+    if not rows:
+        raise ValueError(f"No articles with embeddings found in {db_path}")
+    print(f"Replaying {len(rows)} titles and embeddings from {db_path}")
+    return rows
+
+
+def build_database(workdir, count, replay=None):
+    """Creates database/autonews.db under workdir (the path every stage expects) filled with count rows."""
+    os.chdir(workdir)
+    ArticleIngest.create_db()
+
+    conn = sqlite3.connect('database/autonews.db')
+    batch = []
+    for row in synthetic_rows(count, replay):
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH:
+            conn.executemany('INSERT INTO articles (title, link, published_at, topics, embedding) VALUES (?, ?, ?, ?, ?)', batch)
+            batch = []
+    if batch:
+        conn.executemany('INSERT INTO articles (title, link, published_at, topics, embedding) VALUES (?, ?, ?, ?, ?)', batch)
+    conn.commit()
+    conn.close()
+
+
+def measure(func, calls=1):
+    """Returns (seconds per call, peak traced MB) for func, timing and tracing in separate runs."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    seconds = (time.perf_counter() - start) / calls
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / (1024 * 1024)
+
+
+def run_size(workdir, count, args, replay):
+    print(f"\n=== {count} rows ===")
+    started = time.perf_counter()
+    build_database(workdir, count, replay)
+    print(f"Built database in {time.perf_counter() - started:.1f}s")
+
+    sample_titles = [row[0] for row in synthetic_rows(args.samples, replay, seed=7)]
+    results = {}
+
+    seconds, peak = measure(lambda: createClusters(args.num_topics))
+    results["createClusters"] = {"seconds": seconds, "rows_per_second": count / seconds, "peak_mb": peak}
+
+    seconds, peak = measure(lambda: ScrapeArticle.fetch_top_article_by_embeddings(args.source, sample_titles[0], threshold=0.0))
+    results["fetch_top_article_by_embeddings"] = {"seconds": seconds, "rows_per_second": count / seconds, "peak_mb": peak}
+
+    titles = iter(sample_titles * 2)
+    seconds, peak = measure(lambda: ArticleIngest.extract_topics(next(titles)), calls=args.samples - 1)
+    results["extract_topics"] = {"seconds": seconds, "calls_per_second": 1 / seconds, "peak_mb": peak}
+
+    titles = iter(sample_titles * 2)
+    seconds, peak = measure(
+        lambda: ArticleIngest.insert_article(next(titles), "https://example.com/bench", "Wed, 16 Apr 2025 21:02:57 +0000"),
+        calls=args.samples - 1,
+    )
+    results["insert_article"] = {"seconds": seconds, "calls_per_second": 1 / seconds, "peak_mb": peak}
+
+    for name, result in results.items():
+        print(f"{name:34} {result['seconds'] * 1000:12.2f} ms  peak {result['peak_mb']:9.1f} MB")
+    return results
+
+
+def scaling_exponents(sizes, results):
+    """Log-log slope between consecutive sizes: ~1 is linear, ~2 quadratic."""
+    exponents = {}
+    for name in results[str(sizes[0])]:
+        slopes = []
+        for small, large in zip(sizes, sizes[1:]):
+            t_small = results[str(small)][name]["seconds"]
+            t_large = results[str(large)][name]["seconds"]
+            slopes.append(round(float(np.log(t_large / t_small) / np.log(large / small)), 3))
+        exponents[name] = slopes
+    return exponents
+
+
+def compare(report, baseline_path):
+    with open(baseline_path, "r") as file:
+        baseline = json.load(file)
+
+    print(f"\nComparison against {baseline_path} (new / baseline):")
+    regressions = 0
+    for size, functions in report["results"].items():
+        for name, result in functions.items():
+            previous = baseline["results"].get(size, {}).get(name)
+            if not previous:
+                continue
+            ratio = result["seconds"] / previous["seconds"]
+            flag = "  REGRESSION" if ratio > REGRESSION_RATIO else ""
+            if flag:
+                regressions += 1
+            print(f"{size:>9} {name:34} {ratio:6.2f}x time  {result['peak_mb'] - previous['peak_mb']:+9.1f} MB{flag}")
+    return regressions
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark clustering, matching and ingest against synthetic article stores")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Comma separated row counts (up to 1000000)")
+    parser.add_argument("--titles-from", help="Replay titles and embeddings from an existing autonews.db instead of random ones")
+    parser.add_argument("--samples", type=int, default=50, help="Calls timed for the per-article functions (at least 2)")
+    parser.add_argument("--num-topics", type=int, default=5, help="num_topics passed to createClusters")
+    parser.add_argument("--source", default="", help="source_filter for fetch_top_article_by_embeddings ('' scans every row)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+    if args.samples < 2:
+        # samples - 1 calls are timed and one more is traced for memory
+        parser.error("--samples must be at least 2")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    replay = load_replay(os.path.abspath(args.titles_from)) if args.titles_from else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    repo_dir = os.getcwd()
+
+    # load the models up front so the first timed call doesn't pay for it
+    get_embedding_model()
+    get_nlp()
+
+    results = {}
+    for count in sizes:
+        # one database per size so earlier runs never skew the next
+        with tempfile.TemporaryDirectory() as workdir:
+            try:
+                results[str(count)] = run_size(workdir, count, args, replay)
+            finally:
+                # build_database chdirs into workdir; leave it before it is deleted
+                os.chdir(repo_dir)
+
+    report = {
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "synthetic": args.titles_from is None,
+        "sizes": sizes,
+        "results": results,
+        "scaling_exponents": scaling_exponents(sizes, results) if len(sizes) > 1 else {},
+    }
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results_path = os.path.join(RESULTS_DIR, f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(results_path, "w") as out:
+        json.dump(report, out, indent=4)
+    print(f"\nScaling exponents (time vs rows): {report['scaling_exponents']}")
+    print(f"Results written to {results_path}")
+
+    if baseline_path and compare(report, baseline_path):
+        sys.exit(1)
@@ -16,12 +16,6 @@ python3 -m pip install -r requirements.txt
 
 clear
 
-python3 src/ArticleIngest.py
-
-python3 src/ScrapeArticle.py
-
-python3 src/ScriptCreator.py
-
-python3 src/AudioCreator.py
-
-python3 src/AudioCreator.py
\ No newline at end of file
+# ingest, clustering, scraping, script generation and TTS in one process;
+# pass --resume to continue an interrupted run from its checkpoints
+python3 src/Pipeline.py "$@"
@@ -4,37 +4,36 @@ import os
 from datetime import datetime
 import json
 import re
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 
 import sqlite3
-import feedparser
 from colorama import Fore, Style
-import spacy
-import spacy.cli
-from sentence_transformers import SentenceTransformer
-
 from bs4 import BeautifulSoup
 
+import Metrics
+from Categories import DEFAULT_CATEGORY, get_category
+from FeedStream import parse_feed
+from Filters import FILTERS_CONFIG, get_filter_engine
+from Models import get_embedding_model, get_nlp
+from NearDuplicates import DuplicateIndex, fingerprint, record_syndication
 
-# Load the spaCy English model
-spacy.cli.download("en_core_web_sm")
-nlp = spacy.load("en_core_web_sm")
-
-model = SentenceTransformer('all-MiniLM-L6-v2')
 
 LIMIT_PER_FEED = 30
+DATABASE_PATH = 'database/autonews.db'
 source = ""
 
 '''
-Common keys across all entries:
-links, published_parsed, id, guidislink, title, title_detail, link, published
+Entries come from FeedStream.parse_feed as FeedEntry(title, link, published);
+only those fields are read from the feed.
 '''
 
 
-def create_db():
+def create_db(db_path=DATABASE_PATH):
     conn = None
     try:
-        os.makedirs('database', exist_ok=True)
-        conn = sqlite3.connect('database/autonews.db')
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -44,12 +43,34 @@ def create_db():
                 link TEXT NOT NULL,
                 published_at TEXT,
                 topics TEXT,
-                embedding TEXT
+                embedding TEXT,
+                syndication_count INTEGER NOT NULL DEFAULT 1
+            )
+        ''')
+
+        # databases created before syndication counts were tracked
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(articles)')]
+        if 'syndication_count' not in columns:
+            cursor.execute('ALTER TABLE articles ADD COLUMN syndication_count INTEGER NOT NULL DEFAULT 1')
+
+        # links of syndicated copies, one per outlet, so each outlet is counted once
+        has_links_table = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'article_links'"
+        ).fetchone()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS article_links (
+                article_id INTEGER NOT NULL REFERENCES articles(id),
+                link TEXT NOT NULL,
+                host TEXT NOT NULL,
+                UNIQUE (article_id, host)
             )
         ''')
+        if not has_links_table:
+            # counts from before article_links also counted re-runs and same-outlet feeds
+            cursor.execute('UPDATE articles SET syndication_count = 1')
 
         conn.commit()
-        print("Database and 'articles' table created successfully.")
+        print(f"Database {db_path} and 'articles' table created successfully.")
     except sqlite3.Error as e:
         print(f"An error occurred while creating the database: {e}")
     finally:
@@ -71,9 +92,10 @@ def delete_db():
 
 
 # Extracts main topics, grouping proper nouns into named entities using spaCy, and formats them.
+@Metrics.timed("ingest_extract_topics")
 def extract_topics(title, max_topics=10):
     try:
-        doc = nlp(title)
+        doc = get_nlp()(title)
         topics = []
 
         for ent in doc.ents:
@@ -100,21 +122,25 @@ def extract_topics(title, max_topics=10):
         return None
 
 
-def insert_article(title, link, time):
-    conn = sqlite3.connect('database/autonews.db')
+def insert_article(title, link, time, db_path=DATABASE_PATH):
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
     formatted_time = convert_time(time)
     topics = extract_topics(title)
-    embedding = model.encode(title).tolist()
+    with Metrics.timer("ingest_embed"):
+        embedding = get_embedding_model().encode(title).tolist()
 
-    cursor.execute('''
-        INSERT INTO articles (title, link, published_at, topics, embedding)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (title, link, formatted_time, topics, json.dumps(embedding)))
+    with Metrics.timer("ingest_db_insert"):
+        cursor.execute('''
+            INSERT INTO articles (title, link, published_at, topics, embedding)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (title, link, formatted_time, topics, json.dumps(embedding)))
 
-    conn.commit()
+        conn.commit()
+    article_id = cursor.lastrowid
     conn.close()
+    return article_id
 
 
 # Converts a timestamp string like 'Wed, 16 Apr 2025 21:02:57 +0000' into ISO 8601 format: '2025-04-16 21:02:57'
@@ -127,6 +153,7 @@ def convert_time(raw_time_str):
         return None
     
 
+@Metrics.timed("ingest_resolve_url")
 def resolve_final_url(google_news_url):
     try:
         headers = {"User-Agent": "Mozilla/5.0"}
@@ -148,65 +175,159 @@ def resolve_final_url(google_news_url):
         return google_news_url
 
 
-def main():
+def load_feed_links(feeds_path='config/rssfeeds.txt'):
+    with open(feeds_path, 'r') as file:
+        feed_links = []
+        for feed_link in file.readlines():
+            if feed_link.startswith('#') or not feed_link.strip():
+                Metrics.log(Fore.RED + f"Skipping {feed_link} or empty line." + Style.RESET_ALL)
+                continue
+            feed_links.append(feed_link.strip())
+        return feed_links
+
+
+def load_known_titles(db_path=DATABASE_PATH):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute('SELECT title FROM articles')
+    titles = {row[0] for row in cursor.fetchall()}
+    conn.close()
+    return titles
+
+
+def ingest_feed(feed_link, known_titles=None, cache_headers=None, duplicate_index=None, db_path=DATABASE_PATH, filters_path=FILTERS_CONFIG):
+    """
+    Fetches one feed and inserts its entries into db_path, returning (new_entries, inserted).
+
+    known_titles skips entries that are already stored; a title is added once its entry
+    has been filtered, collapsed or inserted, so an entry whose insert failed is retried.
+    duplicate_index collapses syndicated copies of a stored story into its syndication_count
+    and article_links instead of resolving, embedding and inserting them again.
+    filters_path is the rules file of the feed's category.
+    cache_headers holds the ETag / Last-Modified of the previous fetch; it is sent as a
+    conditional request and updated in place, so an unchanged feed costs a single 304.
+    Raises requests.RequestException if the feed can't be fetched.
+    """
+    headers = {}
+    if cache_headers:
+        if cache_headers.get("ETag"):
+            headers["If-None-Match"] = cache_headers["ETag"]
+        if cache_headers.get("Last-Modified"):
+            headers["If-Modified-Since"] = cache_headers["Last-Modified"]
+
+    with Metrics.timer("ingest_feed_fetch"):
+        req = requests.get(feed_link, headers=headers, timeout=15, stream=True)
+    Metrics.increment("ingest_feeds_fetched")
+    if req.status_code == 304:
+        req.close()
+        Metrics.increment("ingest_feeds_not_modified")
+        Metrics.log(Fore.WHITE + f"{feed_link}: not modified" + Style.RESET_ALL)
+        return 0, 0
+    if not req.ok:
+        req.close()
+        req.raise_for_status()
+
+    if cache_headers is not None:
+        for header in ("ETag", "Last-Modified"):
+            cache_headers[header] = req.headers.get(header)
+
+    # reads the body incrementally and stops after LIMIT_PER_FEED entries
+    with Metrics.timer("ingest_feed_stream"):
+        source, entries = parse_feed(req, LIMIT_PER_FEED)
+
+    if source == "?":
+        print(Fore.RED + f"Error: Feed title not found for {feed_link}." + Style.RESET_ALL)
+
+    filters = get_filter_engine(filters_path)
+    new_entries = 0
+    inserted = 0
+    total_articles = len(entries)
+    for index, entry in enumerate(entries):
+        Metrics.increment("ingest_entries_seen")
+        Metrics.log(Fore.BLUE + f"[{source}:{index + 1}/{total_articles}]")
+        if known_titles is not None and entry.title in known_titles:
+            continue
+        new_entries += 1
+
+        Metrics.log(Fore.GREEN   + f"{entry.title}")
+        # skip words and video links, checked before any network or model work
+        rule = filters.check(entry.title, entry.link)
+        if rule:
+            Metrics.log(Fore.RED + f"Skipping article due to filter rule {rule}: {entry.title}" + Style.RESET_ALL)
+            Metrics.increment("ingest_entries_skipped")
+            if known_titles is not None:
+                known_titles.add(entry.title)
+            continue
+
+        if duplicate_index is not None:
+            title_fingerprint = fingerprint(entry.title)
+            duplicate_of = duplicate_index.find(title_fingerprint)
+            if duplicate_of is not None:
+                if record_syndication(duplicate_of, entry.link, db_path):
+                    Metrics.increment("ingest_entries_syndicated")
+                Metrics.log(Fore.RED + f"Syndicated copy of article {duplicate_of}: {entry.title}" + Style.RESET_ALL)
+                if known_titles is not None:
+                    known_titles.add(entry.title)
+                continue
+
+        real_link = resolve_final_url(entry.link)
+        Metrics.log(Fore.GREEN   + f"{real_link}")
+        Metrics.log(Fore.MAGENTA + f"{entry.published}" + Style.RESET_ALL)
+
+        # if it gets to this point there is enough info to put it into a database
+        article_id = insert_article(entry.title, real_link, entry.published, db_path)
+        if known_titles is not None:
+            known_titles.add(entry.title)
+        if duplicate_index is not None:
+            duplicate_index.add(article_id, title_fingerprint)
+        inserted += 1
+
+    Metrics.increment("ingest_entries_inserted", inserted)
+    print(Fore.WHITE + f"{source}: {inserted} articles inserted from {new_entries} new entries" + Style.RESET_ALL)
+    return new_entries, inserted
+
+
+def ingest_category(category):
+    """Ingests every feed of one category into that category's own database."""
+    db_path = category["database"]
+    create_db(db_path)
+
+    print(Fore.YELLOW + f"Starting to parse {category['name']} feeds at {time.strftime('%Y-%m-%d %H:%M:%S' , time.localtime())}" + Style.RESET_ALL)
+    # entries already stored in an earlier run are skipped, not re-counted as syndicated copies
+    known_titles = load_known_titles(db_path)
+    duplicate_index = DuplicateIndex.from_database(db_path)
+    for feed_link in load_feed_links(category["feeds"]):
+        try:
+            ingest_feed(feed_link, known_titles, duplicate_index=duplicate_index, db_path=db_path, filters_path=category["filters"])
+        except requests.RequestException as e:
+            Metrics.increment("ingest_feed_errors")
+            print(Fore.RED + f"Error fetching {feed_link}: {e}" + Style.RESET_ALL)
+
+
+def main(category_names=(DEFAULT_CATEGORY,)):
 
     #delete_db()
-    create_db()
+    selected = [get_category(name) for name in category_names]
 
-    skip_words = ["Video", "Watch", "Daily Report", "24/7", "CBS", "Here Comes the Sun", "Live", "cartoonists on the week in politics"]
+    # load the models before the threads start so they don't each load a copy
+    get_embedding_model()
+    get_nlp()
+
+    # categories write to separate database files, so they can ingest side by side
+    with ThreadPoolExecutor(max_workers=len(selected)) as executor:
+        for future in [executor.submit(ingest_category, category) for category in selected]:
+            future.result()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--categories", default=DEFAULT_CATEGORY, help="Comma separated feed categories from config/categories.yaml")
+    parser.add_argument("--verbose", action="store_true", help="Print every feed entry as it is processed")
+    return parser.parse_args()
 
-    with open('config/rssfeeds.txt', 'r') as file:
-        print(Fore.YELLOW + f"Starting to parse RSS feeds at {time.strftime('%Y-%m-%d %H:%M:%S' , time.localtime())}")
-        feeds = file.readlines()
-        for feed_link in feeds:
-            if feed_link.startswith('#') or not feed_link.strip():
-                print(Fore.RED + f"Skipping {feed_link} or empty line.")
-                print(Style.RESET_ALL)
-                continue
-                
-            req = requests.get(feed_link.strip())
-            obj = feedparser.parse(req.text) # already formatted as xml text, so no bs4 needed
-
-            try:
-                source = obj['feed']['title']
-                print(Fore.WHITE + f"{source}")
-            except KeyError:
-                source = "?"
-                print(Fore.RED + "Error: Feed title not found.")
-            
-            total_articles = len(obj.entries)
-            for index, entry in enumerate(obj.entries):
-                print(Style.RESET_ALL)
-                if index >= LIMIT_PER_FEED:
-                    print(Fore.RED + f"Limit of {LIMIT_PER_FEED} entries reached for {source}.")
-                    print(Fore.RED + f"There are {total_articles} entries in total.")
-                    print(Style.RESET_ALL)
-                    break
-            
-                print(Fore.BLUE + f"[{source}:{index + 1}/{total_articles}]")
-                try:
-                    print(Fore.GREEN   + f"{entry.title}")
-                    real_link = resolve_final_url(entry.link)
-                    print(Fore.GREEN   + f"{real_link}")
-                    print(Fore.MAGENTA + f"{entry.published}")
-
-                    # Check for skip words
-                    if any(word.lower() in entry.title.lower() for word in skip_words):
-                        print(Fore.RED + f"Skipping article due to skip word match: {entry.title}")
-                        continue
-
-                    if any(keyword in entry.link.lower() for keyword in ["video", "play", "watch", "livestream", "meet-the-press"]):
-                        print(Fore.RED + f"Skipping article due to video link: {entry.link}")
-                        continue
-
-                    # if it gets to this point there is enough info to put it into a database
-                    insert_article(entry.title, real_link, entry.published)
-
-                except AttributeError:
-                    print(Fore.RED + "Error: Missing attribute in entry.")
-
-            print(Style.RESET_ALL)
-
-
-main()
 
+if __name__ == "__main__":
+    args = parse_arguments()
+    Metrics.set_verbose(args.verbose or Metrics.VERBOSE)
+    main(args.categories.split(","))
+    Metrics.write_report(run_name="ingest")
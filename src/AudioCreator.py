@@ -1,11 +1,19 @@
 import json
 import sys
+import io
+import wave
+import argparse
+from array import array
+from xml.sax.saxutils import escape
 
 from google.cloud import texttospeech
+from google.cloud import texttospeech_v1beta1
 import os
 import glob
 import time
 
+import Metrics
+
 
 OUTPUT_FOLDER = "entire-broadcast"
 
@@ -17,7 +25,28 @@ GOOGLE_CHIRP_HD_VOICES = {
     "lao_w": "en-US-Chirp3-HD-Laomedeia",
 }
 
-"""json defined as 
+# Chirp3-HD voices ignore SSML <mark>, so batched mode uses the closest Neural2 voice of each speaker
+GOOGLE_SSML_MARK_VOICES = {
+    "charon_m": "en-US-Neural2-D",
+    "claude_m": "en-US-Neural2-J",
+    "kore_w": "en-US-Neural2-F",
+    "leda_w": "en-US-Neural2-C",
+    "lao_w": "en-US-Neural2-H",
+}
+SSML_MARK_VOICE_TYPES = ("Neural2", "Wavenet", "Studio", "Standard")
+
+SAMPLE_RATE_HZ = 16000
+SAMPLE_WIDTH = 2  # LINEAR16 is 16-bit mono PCM
+WAV_HEADER_BYTES = 44  # size of the plain PCM header the wave module writes
+
+STITCHED_FILENAME = "broadcast.wav"
+SILENCE_THRESHOLD = 500  # absolute sample amplitude below which audio counts as silence
+SILENCE_PADDING_MS = 80  # silence kept on each side of a trimmed line
+
+MAX_SSML_BYTES = 5000  # API limit on the size of one synthesis input
+SSML_LINE_BREAK = '<break time="250ms"/>'  # keeps the cut between two lines inside a pause
+
+"""json defined as
 {
   mainTitle: str
   characters: list<str>
@@ -29,91 +58,327 @@ GOOGLE_CHIRP_HD_VOICES = {
 """
 
 
+def speaker_for(character):
+    if character == "Emily":
+        return "lao_w"
+    elif character == "David":
+        return "claude_m"
+    else:
+        return "charon_m"
 
-def synthesise_speech(text, filename, speaker):
+
+def supports_ssml_marks(voice_name):
+    return any(f"-{voice_type}-" in voice_name for voice_type in SSML_MARK_VOICE_TYPES)
+
+
+# checked once here rather than per request: a voice without marks would fail every batch
+_unsupported = [name for name in GOOGLE_SSML_MARK_VOICES.values() if not supports_ssml_marks(name)]
+if _unsupported:
+    raise ValueError(f"GOOGLE_SSML_MARK_VOICES has voices without SSML mark support: {', '.join(_unsupported)}")
+
+
+def request_speech(text, speaker, audio_encoding, voices=GOOGLE_CHIRP_HD_VOICES):
     client = texttospeech.TextToSpeechClient()
 
     input_text = texttospeech.SynthesisInput(text=text)
 
     voice = texttospeech.VoiceSelectionParams(
         language_code="en-US",
-        name=GOOGLE_CHIRP_HD_VOICES[speaker],
+        name=voices[speaker],
     )
 
     audio_config = texttospeech.AudioConfig(
-        audio_encoding=texttospeech.AudioEncoding.MP3, sample_rate_hertz=16000
+        audio_encoding=audio_encoding, sample_rate_hertz=SAMPLE_RATE_HZ
     )
-    print(f"Generating {filename} with {speaker} voice...")
-    print(f"Input text: {text}")
-    print(f"Voice: {voice.name}")
-    print(f"Audio config: {audio_config.audio_encoding.name}, {audio_config.sample_rate_hertz} Hz")
+    Metrics.log(f"Input text: {text}")
+    Metrics.log(f"Voice: {voice.name}")
+    Metrics.log(f"Audio config: {audio_config.audio_encoding.name}, {audio_config.sample_rate_hertz} Hz")
 
-    try:
+    with Metrics.timer("tts_request"):
         response = client.synthesize_speech(
             input=input_text, voice=voice, audio_config=audio_config
         )
-        # if hte does not exist, create it
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        # Write the response to the output file
-        with open(filename, "wb") as out:
-            out.write(response.audio_content)
-        
-    except Exception as e:
-        print(f"Error generating speech: {e}")
-        sys.exit(1)
+    Metrics.increment("tts_requests")
+    Metrics.increment("tts_characters", len(text))
+    return response.audio_content
+
+
+# TTS errors are raised to the caller: __main__ stops on them, the pipeline skips the segment
+def synthesise_speech(text, filename, speaker):
+    Metrics.log(f"Generating {filename} with {speaker} voice...")
+    audio_content = request_speech(text, speaker, texttospeech.AudioEncoding.MP3)
+    # if hte does not exist, create it
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    # Write the response to the output file
+    with open(filename, "wb") as out:
+        out.write(audio_content)
+
+
+def synthesise_pcm(text, speaker, voices=GOOGLE_CHIRP_HD_VOICES):
+    """Synthesises one line as raw 16-bit PCM frames (the WAV header is stripped)."""
+    audio_content = request_speech(text, speaker, texttospeech.AudioEncoding.LINEAR16, voices)
+    with wave.open(io.BytesIO(audio_content), "rb") as wav:
+        return wav.readframes(wav.getnframes())
+
+
+def build_ssml_batches(lines, max_bytes=MAX_SSML_BYTES):
+    """
+    Packs (idx, text) pairs into as few SSML documents as fit under max_bytes,
+    with a <mark> in front of every line so its start time can be recovered.
+    """
+    batches = []
+    pieces = []
+    indices = []
+    size = len("<speak></speak>")
+
+    for idx, text in lines:
+        piece = f'<mark name="line{idx}"/>{escape(text)}{SSML_LINE_BREAK}'
+        piece_size = len(piece.encode("utf-8"))
+        if pieces and size + piece_size > max_bytes:
+            batches.append(("<speak>" + "".join(pieces) + "</speak>", indices))
+            pieces, indices, size = [], [], len("<speak></speak>")
+        pieces.append(piece)
+        indices.append(idx)
+        size += piece_size
+
+    if pieces:
+        batches.append(("<speak>" + "".join(pieces) + "</speak>", indices))
+    return batches
+
+
+def request_ssml_speech(ssml, voice_name):
+    """Synthesises an SSML document as LINEAR16 and returns (pcm, {mark name: seconds})."""
+    client = texttospeech_v1beta1.TextToSpeechClient()
+
+    request = texttospeech_v1beta1.SynthesizeSpeechRequest(
+        input=texttospeech_v1beta1.SynthesisInput(ssml=ssml),
+        voice=texttospeech_v1beta1.VoiceSelectionParams(
+            language_code="en-US",
+            name=voice_name,
+        ),
+        audio_config=texttospeech_v1beta1.AudioConfig(
+            audio_encoding=texttospeech_v1beta1.AudioEncoding.LINEAR16, sample_rate_hertz=SAMPLE_RATE_HZ
+        ),
+        enable_time_pointing=[texttospeech_v1beta1.SynthesizeSpeechRequest.TimepointType.SSML_MARK],
+    )
+    with Metrics.timer("tts_request"):
+        response = client.synthesize_speech(request=request)
+    Metrics.increment("tts_requests")
+    Metrics.increment("tts_characters", len(ssml))
+
+    with wave.open(io.BytesIO(response.audio_content), "rb") as wav:
+        pcm = wav.readframes(wav.getnframes())
+    marks = {point.mark_name: point.time_seconds for point in response.timepoints}
+    return pcm, marks
+
 
+def split_batch(pcm, marks, indices):
+    """Cuts a batch back into one PCM chunk per line using the mark timings."""
+    offsets = []
+    for idx in indices:
+        offset = int(marks[f"line{idx}"] * SAMPLE_RATE_HZ) * SAMPLE_WIDTH
+        offsets.append(min(offset, len(pcm)))
+    offsets.append(len(pcm))
 
+    return {
+        idx: pcm[offsets[i]:offsets[i + 1]]
+        for i, idx in enumerate(indices)
+    }
 
-generated_scripts_folder = "generated_scripts"
-script_files = glob.glob(os.path.join(generated_scripts_folder, "*.json"))
 
-print(f"Found {len(script_files)} script files in {generated_scripts_folder}")
+def synthesise_lines(lines, speaker, voices):
+    """Synthesises (idx, text) pairs with one request each."""
+    pcm_by_index = {}
+    for idx, text in lines:
+        pcm_by_index[idx] = synthesise_pcm(text, speaker, voices)
+        time.sleep(0.5)
+    return pcm_by_index
 
-scripts = []
-#! TODO: add the char list in header of json scripts
 
-for script_path in script_files:
-    with open(script_path, "r") as file:
-        try:
-            script = json.load(file)
-            scripts.append(script)
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON from {script_path}: {e}")
+def synthesise_batched(dialogue):
+    """
+    Synthesises a whole script with one request per speaker batch instead of one per line.
+    Lines of the same voice are batched together even when they are not consecutive, since
+    they are cut apart again afterwards. Every line of a speaker, including the fallback,
+    uses its GOOGLE_SSML_MARK_VOICES voice, so a segment never mixes two voices for one
+    character. Returns {line index: pcm}.
+    """
+    lines_by_speaker = {}
+    for idx, line in enumerate(dialogue, start=1):
+        lines_by_speaker.setdefault(speaker_for(line["character"]), []).append((idx, line["line"]))
 
+    voices = GOOGLE_SSML_MARK_VOICES
+    pcm_by_index = {}
+    for speaker, lines in lines_by_speaker.items():
+        for ssml, indices in build_ssml_batches(lines):
+            print(f"Generating lines {indices} with {speaker} voice in one request...")
+            try:
+                pcm, marks = request_ssml_speech(ssml, voices[speaker])
+                if any(f"line{idx}" not in marks for idx in indices):
+                    raise ValueError("response is missing mark timepoints")
+                pcm_by_index.update(split_batch(pcm, marks, indices))
+            except Exception as e:
+                print(f"Batched request failed ({e}), synthesising lines one by one...")
+                texts = dict(lines)
+                pcm_by_index.update(synthesise_lines([(idx, texts[idx]) for idx in indices], speaker, voices))
 
-                    
-for script in scripts:
+            time.sleep(0.5)  # same pause as between single lines so i dont get rate limted
+    return pcm_by_index
+
+
+def write_wav_file(filename, pcm):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with wave.open(filename, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(SAMPLE_WIDTH)
+        out.setframerate(SAMPLE_RATE_HZ)
+        out.writeframes(pcm)
+
+
+def trim_silence(pcm, threshold=SILENCE_THRESHOLD, padding_ms=SILENCE_PADDING_MS):
+    """Drops leading and trailing silence from 16-bit PCM, keeping a little padding."""
+    samples = array("h")
+    samples.frombytes(pcm)
+    if sys.byteorder == "big":
+        samples.byteswap()
+
+    start = 0
+    while start < len(samples) and abs(samples[start]) < threshold:
+        start += 1
+    if start == len(samples):
+        return b""
+
+    end = len(samples)
+    while end > start and abs(samples[end - 1]) < threshold:
+        end -= 1
+
+    padding = SAMPLE_RATE_HZ * padding_ms // 1000
+    start = max(0, start - padding)
+    end = min(len(samples), end + padding)
+    return pcm[start * SAMPLE_WIDTH:end * SAMPLE_WIDTH]
+
+
+def write_stitched_audio(segment_folder, lines, pcm_lines):
+    """
+    Writes every line of a segment into one WAV file and returns the timing index
+    stored in metadata.json, so the player can seek to a line without opening a file per line.
+    """
+    audio_path = os.path.join(segment_folder, STITCHED_FILENAME)
+    os.makedirs(segment_folder, exist_ok=True)
+
+    index = []
+    byte_offset = WAV_HEADER_BYTES
+    with wave.open(audio_path, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(SAMPLE_WIDTH)
+        out.setframerate(SAMPLE_RATE_HZ)
+
+        for idx, (line, pcm) in enumerate(zip(lines, pcm_lines), start=1):
+            out.writeframes(pcm)
+            start = (byte_offset - WAV_HEADER_BYTES) / (SAMPLE_RATE_HZ * SAMPLE_WIDTH)
+            duration = len(pcm) / (SAMPLE_RATE_HZ * SAMPLE_WIDTH)
+            index.append({
+                "index": idx,
+                "character": line["character"],
+                "line": line["line"],
+                "byteOffset": byte_offset,
+                "byteLength": len(pcm),
+                "start": round(start, 3),
+                "end": round(start + duration, 3),
+            })
+            byte_offset += len(pcm)
+
+    print(f"Stitched {len(index)} lines into {audio_path}")
+    return {
+        "file": STITCHED_FILENAME,
+        "sampleRate": SAMPLE_RATE_HZ,
+        "sampleWidth": SAMPLE_WIDTH,
+        "channels": 1,
+        "lines": index,
+    }
+
+
+def load_scripts(generated_scripts_folder="generated_scripts"):
+    script_files = glob.glob(os.path.join(generated_scripts_folder, "*.json"))
+
+    print(f"Found {len(script_files)} script files in {generated_scripts_folder}")
+
+    scripts = []
+    #! TODO: add the char list in header of json scripts
+
+    for script_path in script_files:
+        with open(script_path, "r") as file:
+            try:
+                script = json.load(file)
+                scripts.append(script)
+            except json.JSONDecodeError as e:
+                print(f"Error decoding JSON from {script_path}: {e}")
+    return scripts
+
+
+def create_segment_audio(script, stitched=False, trim=False, batched=False, output_folder=OUTPUT_FOLDER):
     print (f"Processing script: {script['mainTitle']}")
-    # yn = input(f"Do you want to generate audio for {script['mainTitle']}? (y/n): ")
-    # if yn.lower() != "y":
-    #     print("Skipping...")
-    #     continue
-    
-    speaking_order = []
-    final_lines = []
+
+    segment_title = script["mainTitle"].replace(" ", "-")
+    segment_folder = f"{output_folder}/{segment_title}"
+    pcm_by_index = synthesise_batched(script["dialogue"]) if batched else {}
+    pcm_lines = []
 
     for idx, line in enumerate(script["dialogue"], start=1):
         character = line["character"]
         dialogue = line["line"]
-        speaker = ""
-        if character == "Emily":
-            speaker = "lao_w"
-        elif character == "David":
-            speaker = "claude_m"
+        speaker = speaker_for(character)
+
+        if batched or stitched:
+            if batched:
+                pcm = pcm_by_index[idx]
+            else:
+                Metrics.log(f"Generating line {idx} with {speaker} voice...")
+                pcm = synthesise_pcm(dialogue, speaker)
+                time.sleep(0.5)  # Sleep for 0.5 seconds between each line so i dont get rate limted
+            if trim:
+                pcm = trim_silence(pcm)
+
+            if stitched:
+                pcm_lines.append(pcm)
+                filename = f"{STITCHED_FILENAME}#{idx}"
+            else:
+                filename = f"{idx}_{character}.wav"
+                write_wav_file(f"{segment_folder}/audio/{filename}", pcm)
         else:
-            speaker = "charon_m"
+            filename = f"{idx}_{character}.mp3"
+            synthesise_speech(dialogue, f"{segment_folder}/audio/{filename}", speaker)
+            time.sleep(0.5)  # Sleep for 0.5 seconds between each line so i dont get rate limted
 
-        segment_title = script["mainTitle"].replace(" ", "-")
-        synthesise_speech(dialogue, f"{OUTPUT_FOLDER}/{segment_title}/audio/{idx}_{character}.mp3", speaker)
+        Metrics.log(f"{output_folder}/{filename}->{character}: {dialogue}")
 
-        speaking_order.append(character)
-        filename = f"{idx}_{character}.mp3"
-        print(f"{OUTPUT_FOLDER}/{filename}->", end="")
-        print(f"{character}: {dialogue}")
-        
-        time.sleep(0.5)  # Sleep for 0.5 seconds between each line so i dont get rate limted
+    if stitched:
+        script["audioIndex"] = write_stitched_audio(segment_folder, script["dialogue"], pcm_lines)
 
-    metadata_path = f"{OUTPUT_FOLDER}/{segment_title}/metadata.json"
+    metadata_path = f"{segment_folder}/metadata.json"
     os.makedirs(os.path.dirname(metadata_path), exist_ok=True)
     with open(metadata_path, "w") as out:
-        json.dump(script, out, indent=4)
\ No newline at end of file
+        json.dump(script, out, indent=4)
+    return metadata_path
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--verbose", action="store_true", help="Print every line as it is synthesised")
+    parser.add_argument("--stitched", action="store_true", help=f"Write one {STITCHED_FILENAME} per segment with a timing index in metadata.json")
+    parser.add_argument("--trim-silence", action="store_true", help="Trim leading and trailing silence from each line (stitched or batched output only)")
+    parser.add_argument("--batched", action="store_true", help=f"Synthesise many lines per request using SSML marks (up to {MAX_SSML_BYTES} bytes each) with Neural2 voices")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    Metrics.set_verbose(args.verbose or Metrics.VERBOSE)
+    try:
+        for script in load_scripts():
+            create_segment_audio(script, stitched=args.stitched, trim=args.trim_silence, batched=args.batched)
+    except Exception as e:
+        print(f"Error generating speech: {e}")
+        sys.exit(1)
+    finally:
+        Metrics.write_report(run_name="audio")
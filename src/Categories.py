@@ -0,0 +1,28 @@
+import os
+
+import yaml
+
+
+CATEGORIES_CONFIG = os.path.join("config", "categories.yaml")
+DEFAULT_CATEGORY = "news"
+
+"""
+Feed categories (news, games, sports, ...) from config/categories.yaml. Every category
+has its own feed list and its own sqlite file, so each show type only ingests, clusters
+and matches its own articles, and categories never contend on one table.
+"""
+
+
+def load_categories(config_path=CATEGORIES_CONFIG):
+    with open(config_path, "r") as f:
+        categories = yaml.safe_load(f) or {}
+    for name, category in categories.items():
+        category["name"] = name
+    return categories
+
+
+def get_category(name, config_path=CATEGORIES_CONFIG):
+    categories = load_categories(config_path)
+    if name not in categories:
+        raise ValueError(f"Unknown category '{name}', expected one of: {', '.join(categories)}")
+    return categories[name]
@@ -0,0 +1,121 @@
+from collections import namedtuple
+from xml.etree.ElementTree import XMLPullParser, ParseError
+
+import feedparser
+
+
+CHUNK_SIZE = 16 * 1024
+
+ITEM_TAGS = {"item", "entry"}  # RSS, Atom
+PUBLISHED_TAGS = ("pubDate", "published", "date", "updated")  # in order of preference
+
+# Namespaces whose elements are read, best first: plain RSS 2.0 / Atom / RSS 1.0, then
+# Dublin Core (dc:date). Anything else (media:title, itunes:title, ...) is ignored.
+FEED_NAMESPACES = {"": 0, "http://www.w3.org/2005/Atom": 0, "http://purl.org/rss/1.0/": 0, "http://purl.org/dc/elements/1.1/": 1}
+
+FeedEntry = namedtuple("FeedEntry", ["title", "link", "published"])
+
+"""
+Reads an RSS or Atom feed off the network incrementally and keeps only the fields
+ingest uses (title, link, published). Reading stops as soon as `limit` entries are
+collected, so a feed with hundreds of items costs no more than its first few chunks.
+Feeds that aren't well-formed XML (undeclared HTML entities and the like) fall back to
+feedparser on the full text.
+"""
+
+
+def _local_name(tag):
+    # "{http://www.w3.org/2005/Atom}entry" -> "entry"
+    return tag.rsplit("}", 1)[-1]
+
+
+def _namespace_rank(tag):
+    """Priority of the tag's namespace in FEED_NAMESPACES (lower is better), or None to ignore it."""
+    namespace = tag[1:].split("}", 1)[0] if tag.startswith("{") else ""
+    return FEED_NAMESPACES.get(namespace)
+
+
+def _entry_from_element(element):
+    ranked = {}
+    for child in element:
+        rank = _namespace_rank(child.tag)
+        if rank is None:
+            continue
+        name = _local_name(child.tag)
+        value = None
+        if name == "link":
+            # Atom puts the url in href; prefer the alternate (article) link
+            href = child.get("href")
+            if href and child.get("rel", "alternate") == "alternate":
+                value = href
+            elif child.text and child.text.strip():
+                value = child.text.strip()
+        elif child.text and child.text.strip():
+            value = child.text.strip()
+
+        # first value of the best namespace wins, so <title> beats a later <dc:title>
+        if value and (name not in ranked or rank < ranked[name][0]):
+            ranked[name] = (rank, value)
+    fields = {name: value for name, (_, value) in ranked.items()}
+
+    published = next((fields[tag] for tag in PUBLISHED_TAGS if tag in fields), None)
+    if not fields.get("title") or not fields.get("link") or not published:
+        return None
+    return FeedEntry(fields["title"], fields["link"], published)
+
+
+def _parse_with_feedparser(text, limit):
+    obj = feedparser.parse(text)
+    source = obj.feed.get("title", "?")
+    entries = []
+    for entry in obj.entries[:limit]:
+        if entry.get("title") and entry.get("link") and entry.get("published"):
+            entries.append(FeedEntry(entry.title, entry.link, entry.published))
+    return source, entries
+
+
+def parse_feed(response, limit):
+    """
+    Returns (feed title, [FeedEntry]) with at most `limit` entries from a requests
+    response opened with stream=True. Entries missing a title, link or date are dropped.
+    """
+    parser = XMLPullParser(events=("start", "end"))
+    source = "?"
+    entries = []
+    received = []
+    depth_in_item = 0
+    stack = []
+
+    try:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            received.append(chunk)
+            parser.feed(chunk)
+
+            for event, element in parser.read_events():
+                name = _local_name(element.tag)
+                is_item = name in ITEM_TAGS and _namespace_rank(element.tag) == 0
+                if event == "start":
+                    stack.append(name)
+                    if is_item:
+                        depth_in_item += 1
+                    continue
+
+                stack.pop()
+                if is_item:
+                    depth_in_item -= 1
+                    entry = _entry_from_element(element)
+                    if entry:
+                        entries.append(entry)
+                    element.clear()
+                    if len(entries) >= limit:
+                        return source, entries
+                elif name == "title" and _namespace_rank(element.tag) == 0 and not depth_in_item and stack and stack[-1] in {"channel", "feed"}:
+                    source = (element.text or "?").strip()
+    except ParseError:
+        # not well-formed XML; read the rest and let feedparser deal with it
+        received.extend(response.iter_content(chunk_size=CHUNK_SIZE))
+        return _parse_with_feedparser(b"".join(received), limit)
+    finally:
+        response.close()
+
+    return source, entries
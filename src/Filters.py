@@ -0,0 +1,98 @@
+import os
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+
+import ahocorasick
+import yaml
+
+import Metrics
+
+
+FILTERS_CONFIG = os.path.join("config", "filters.yaml")
+
+"""
+Drops junk entries (videos, live blogs, recurring shows) by title and link.
+
+Every category has its own rules file (config/filters.yaml for news, see the filters key
+in config/categories.yaml). Every rule in it -- global title rules, url rules and per-source title
+rules -- is compiled into one Aho-Corasick automaton (pyahocorasick, in C), so checking
+an entry is a single pass over its title and a single pass over its link however many
+rules there are. Each rule keeps a hit counter, which is also exported through Metrics.
+"""
+
+
+class Automaton:
+    """Aho-Corasick matcher over lowercased text; each pattern carries a list of tags."""
+
+    def __init__(self, patterns):
+        # pyahocorasick keeps one value per key, so tags of the same pattern are grouped
+        tags_by_pattern = {}
+        for pattern, tag in patterns:
+            tags_by_pattern.setdefault(pattern.lower(), []).append(tag)
+
+        self.automaton = ahocorasick.Automaton()
+        for pattern, tags in tags_by_pattern.items():
+            self.automaton.add_word(pattern, tags)
+        self.automaton.make_automaton()
+        self.empty = not tags_by_pattern
+
+    def search(self, text):
+        """Yields the tags of every pattern found in text."""
+        if self.empty:
+            return
+        for _, tags in self.automaton.iter(text.lower()):
+            yield from tags
+
+
+class FilterEngine:
+    def __init__(self, config):
+        patterns = []
+        for word in config.get("title") or []:
+            patterns.append((word, ("title", None, word)))
+        for keyword in config.get("url") or []:
+            patterns.append((keyword, ("url", None, keyword)))
+        for source, words in (config.get("sources") or {}).items():
+            # the source name itself, to tell which source a link belongs to
+            patterns.append((source, ("source", source, source)))
+            for word in words or []:
+                patterns.append((word, ("title", source, word)))
+
+        self.automaton = Automaton(patterns)
+        self.hits = Counter()
+        self._hits_lock = threading.Lock()  # categories are ingested from several threads
+
+    def check(self, title, link):
+        """Returns the name of the first rule the entry matches, or None if it passes."""
+        link_sources = set()
+        for field, source, pattern in self.automaton.search(link or ""):
+            if field == "url":
+                return self._hit(f"url:{pattern}")
+            if field == "source":
+                link_sources.add(source)
+
+        for field, source, pattern in self.automaton.search(title or ""):
+            if field != "title":
+                continue
+            if source is None:
+                return self._hit(f"title:{pattern}")
+            if source in link_sources:
+                return self._hit(f"{source}:title:{pattern}")
+        return None
+
+    def _hit(self, rule):
+        with self._hits_lock:
+            self.hits[rule] += 1
+        Metrics.increment("filter_hit_" + re.sub(r"\W+", "_", rule.lower()).strip("_"))
+        return rule
+
+
+def load_filters_config(config_path=FILTERS_CONFIG):
+    with open(config_path, "r") as f:
+        return yaml.safe_load(f) or {}
+
+
+@lru_cache(maxsize=None)
+def get_filter_engine(config_path=FILTERS_CONFIG):
+    return FilterEngine(load_filters_config(config_path))
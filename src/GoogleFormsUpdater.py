@@ -12,34 +12,47 @@ from google.auth.transport.requests import Request
 import pickle
 import os
 
+import Metrics
 
-def createClusters(num_topics):
-    conn = sqlite3.connect('database/autonews.db')
+
+def createClusters(num_topics, weighted=True, db_path='database/autonews.db'):
+    """
+    Clusters the stored article embeddings and returns the representative title of the
+    num_topics densest clusters. With weighted, each article counts once per outlet that
+    syndicated it, so a wire story collapsed at ingest still ranks as widely covered.
+    db_path selects the category database to cluster.
+    """
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
-    cursor.execute('SELECT title, embedding FROM articles WHERE embedding IS NOT NULL')
-    rows = cursor.fetchall()
+    with Metrics.timer("cluster_load_embeddings"):
+        cursor.execute('SELECT title, embedding, syndication_count FROM articles WHERE embedding IS NOT NULL')
+        rows = cursor.fetchall()
 
-    titles = []
-    embeddings = []
+        titles = []
+        embeddings = []
+        weights = []
 
-    for row in rows:
-        titles.append(row[0])
-        embeddings.append(json.loads(row[1]))
+        for row in rows:
+            titles.append(row[0])
+            embeddings.append(json.loads(row[1]))
+            weights.append(row[2] if weighted else 1)
 
-    embeddings = np.array(embeddings)
-    embeddings = normalize(embeddings)
+        embeddings = np.array(embeddings)
+        embeddings = normalize(embeddings)
+    Metrics.increment("cluster_articles", len(titles))
 
     oversample_clusters = int(num_topics * 2.5)
     kmeans = KMeans(n_clusters=oversample_clusters, random_state=42)
-    kmeans.fit(embeddings)
+    with Metrics.timer("cluster_kmeans"):
+        kmeans.fit(embeddings, sample_weight=weights)
 
     labels = kmeans.labels_
     centers = kmeans.cluster_centers_
 
     cluster_density = {}
-    for label in labels:
-        cluster_density[label] = cluster_density.get(label, 0) + 1
+    for label, weight in zip(labels, weights):
+        cluster_density[label] = cluster_density.get(label, 0) + weight
 
     sorted_clusters = sorted(cluster_density.items(), key=lambda x: x[1], reverse=True)
 
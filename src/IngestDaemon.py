@@ -0,0 +1,154 @@
+import time
+import heapq
+import random
+import argparse
+
+import requests
+from colorama import Fore, Style
+
+import ArticleIngest
+import Metrics
+from Categories import DEFAULT_CATEGORY, get_category
+from Filters import FILTERS_CONFIG
+from NearDuplicates import DuplicateIndex
+
+
+MIN_INTERVAL = 5 * 60  # fast wire feeds
+MAX_INTERVAL = 6 * 60 * 60  # slow magazines
+INITIAL_INTERVAL = 30 * 60
+TARGET_NEW_PER_POLL = 3  # aim to pick up about this many new entries per poll
+RATE_SMOOTHING = 0.3  # weight of the latest poll in the publish rate average
+JITTER = 0.1  # +/- fraction of the interval, so feeds drift apart instead of polling together
+ERROR_BACKOFF = 2  # interval multiplier per consecutive error
+REPORT_INTERVAL = 60 * 60
+
+"""
+Keeps ingesting in the background instead of sweeping every feed at once.
+
+Every feed gets its own poll interval, derived from how many new entries it has been
+publishing per hour: a feed that turns over quickly is polled every few minutes, a
+slow one every few hours. Polls use conditional requests, so unchanged feeds cost a
+304, and failing feeds back off exponentially.
+"""
+
+
+class FeedState:
+    def __init__(self, feed_link):
+        self.feed_link = feed_link
+        self.interval = INITIAL_INTERVAL
+        self.rate_per_hour = None
+        self.last_poll = None
+        self.next_poll = 0
+        self.errors = 0
+        self.cache_headers = {}
+
+    def record_poll(self, new_entries, now):
+        # the first poll returns the feed's whole backlog, which says nothing about its rate
+        if self.last_poll is not None:
+            hours = max(now - self.last_poll, 1) / 3600
+            observed = new_entries / hours
+            if self.rate_per_hour is None:
+                self.rate_per_hour = observed
+            else:
+                self.rate_per_hour = RATE_SMOOTHING * observed + (1 - RATE_SMOOTHING) * self.rate_per_hour
+
+        if self.rate_per_hour:
+            interval = TARGET_NEW_PER_POLL / self.rate_per_hour * 3600
+        elif self.last_poll is not None:
+            # nothing published yet, back off gradually
+            interval = self.interval * 1.5
+        else:
+            interval = INITIAL_INTERVAL
+
+        self.last_poll = now
+        self.errors = 0
+        self.interval = min(max(interval, MIN_INTERVAL), MAX_INTERVAL)
+        self.schedule(now, self.interval)
+
+    def record_error(self, now):
+        self.errors += 1
+        self.schedule(now, min(self.interval * ERROR_BACKOFF ** self.errors, MAX_INTERVAL))
+
+    def schedule(self, now, interval):
+        self.next_poll = now + interval * random.uniform(1 - JITTER, 1 + JITTER)
+
+
+class FeedScheduler:
+    def __init__(self, feed_links, db_path=ArticleIngest.DATABASE_PATH, report_name="daemon", filters_path=FILTERS_CONFIG):
+        self.db_path = db_path
+        self.filters_path = filters_path
+        self.report_name = report_name
+        self.states = {feed_link: FeedState(feed_link) for feed_link in feed_links}
+        self.known_titles = ArticleIngest.load_known_titles(db_path)
+        self.duplicate_index = DuplicateIndex.from_database(db_path)
+        # stagger the first sweep slightly so the feeds don't all hit the network at once
+        self.queue = [(random.uniform(0, 5), feed_link) for feed_link in feed_links]
+        heapq.heapify(self.queue)
+
+    def poll(self, state):
+        now = time.time()
+        try:
+            new_entries, _ = ArticleIngest.ingest_feed(
+                state.feed_link, self.known_titles, state.cache_headers, self.duplicate_index, self.db_path, self.filters_path
+            )
+            state.record_poll(new_entries, now)
+        except requests.RequestException as e:
+            Metrics.increment("ingest_feed_errors")
+            state.record_error(now)
+            print(Fore.RED + f"Error fetching {state.feed_link} ({state.errors} in a row): {e}" + Style.RESET_ALL)
+        except Exception as e:
+            # e.g. "database is locked" while a pipeline run writes checkpoints; one feed
+            # failing must not stop the daemon and lose every other feed's schedule
+            Metrics.increment("ingest_poll_errors")
+            state.record_error(now)
+            # refetch in full next time, or a 304 would hide the entries that weren't stored
+            state.cache_headers.clear()
+            print(Fore.RED + f"Error ingesting {state.feed_link} ({state.errors} in a row): {e!r}" + Style.RESET_ALL)
+        finally:
+            heapq.heappush(self.queue, (state.next_poll, state.feed_link))
+
+        rate = f"{state.rate_per_hour:.1f}/h" if state.rate_per_hour is not None else "unknown rate"
+        print(Fore.YELLOW + f"[{time.strftime('%H:%M:%S')}] {state.feed_link}: {rate}, next poll in {(state.next_poll - time.time()) / 60:.0f} min" + Style.RESET_ALL)
+
+    def run(self):
+        start = time.time()
+        self.queue = [(start + offset, feed_link) for offset, feed_link in self.queue]
+        next_report = start + REPORT_INTERVAL
+
+        while self.queue:
+            due, feed_link = heapq.heappop(self.queue)
+            delay = due - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+            self.poll(self.states[feed_link])
+
+            if time.time() >= next_report:
+                Metrics.write_report(run_name=self.report_name)
+                next_report = time.time() + REPORT_INTERVAL
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Continuously ingest RSS feeds with a per-feed adaptive schedule")
+    parser.add_argument("--category", default=DEFAULT_CATEGORY, help="Feed category from config/categories.yaml; run one daemon per category")
+    parser.add_argument("--feeds", help="Feed list to poll instead of the category's")
+    parser.add_argument("--verbose", action="store_true", help="Print every feed entry as it is processed")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    Metrics.set_verbose(args.verbose or Metrics.VERBOSE)
+    category = get_category(args.category)
+    ArticleIngest.create_db(category["database"])
+
+    scheduler = FeedScheduler(
+        ArticleIngest.load_feed_links(args.feeds or category["feeds"]), category["database"], f"daemon-{category['name']}",
+        category["filters"],
+    )
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        print("Stopping ingest daemon.")
+    finally:
+        Metrics.write_report(run_name=scheduler.report_name)
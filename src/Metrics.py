@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from datetime import datetime
+
+
+REPORT_DIR = "reports"
+PROMETHEUS_FILE = "autonews-{run_name}.prom"  # one per run name, so concurrent processes never overwrite each other
+METRIC_PREFIX = "autonews_"
+
+# Upper bounds (seconds) of the histogram buckets, from a sqlite insert up to a full LLM generation
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Per-entry progress output is only printed when verbose; it is itself a cost at thousands of entries
+VERBOSE = os.environ.get("AUTONEWS_VERBOSE", "").lower() in {"1", "true", "yes"}
+
+"""
+Lightweight run instrumentation shared by every stage:
+
+    with Metrics.timer("ingest_feed_fetch"):
+        ...
+    Metrics.increment("ingest_entries_inserted")
+    Metrics.write_report()
+
+Timers record into histograms (in seconds). Everything is kept in-process and
+written out at the end of a run as a JSON report and a Prometheus text file.
+"""
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_started_at = datetime.now()
+
+
+def set_verbose(verbose):
+    global VERBOSE
+    VERBOSE = verbose
+
+
+def log(message):
+    if VERBOSE:
+        print(message)
+
+
+def increment(name, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def observe(name, value):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = {"count": 0, "sum": 0.0, "min": value, "max": value, "buckets": [0] * len(BUCKETS)}
+            _histograms[name] = histogram
+
+        histogram["count"] += 1
+        histogram["sum"] += value
+        histogram["min"] = min(histogram["min"], value)
+        histogram["max"] = max(histogram["max"], value)
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                histogram["buckets"][i] += 1
+                break
+
+
+@contextmanager
+def timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """Decorator form of timer()."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def reset():
+    global _started_at
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        _started_at = datetime.now()
+
+
+def snapshot():
+    with _lock:
+        histograms = {}
+        for name, histogram in _histograms.items():
+            histograms[name] = {
+                "count": histogram["count"],
+                "sum": round(histogram["sum"], 6),
+                "mean": round(histogram["sum"] / histogram["count"], 6),
+                "min": round(histogram["min"], 6),
+                "max": round(histogram["max"], 6),
+                "buckets": {str(bound): count for bound, count in zip(BUCKETS, histogram["buckets"])},
+            }
+        return {
+            "started_at": _started_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "finished_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "counters": dict(_counters),
+            "timers": histograms,
+        }
+
+
+def to_prometheus(report, run_name="run"):
+    # every series carries the run name, so the files of different runs can be collected side by side
+    run = f'run="{run_name}"'
+    lines = []
+    for name, value in sorted(report["counters"].items()):
+        metric = f"{METRIC_PREFIX}{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric}{{{run}}} {value}")
+
+    for name, histogram in sorted(report["timers"].items()):
+        metric = f"{METRIC_PREFIX}{name}_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, count in histogram["buckets"].items():
+            cumulative += count
+            lines.append(f'{metric}_bucket{{{run},le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{{run},le="+Inf"}} {histogram["count"]}')
+        lines.append(f"{metric}_sum{{{run}}} {histogram['sum']}")
+        lines.append(f"{metric}_count{{{run}}} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def write_report(report_dir=REPORT_DIR, run_name="run"):
+    """Writes reports/<run_name>-<timestamp>.json and replaces reports/autonews-<run_name>.prom with the same numbers."""
+    report = snapshot()
+    os.makedirs(report_dir, exist_ok=True)
+
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    json_path = os.path.join(report_dir, f"{run_name}-{timestamp}.json")
+    with open(json_path, "w") as out:
+        json.dump(report, out, indent=4)
+
+    # written next to it and swapped in, so a scraper never reads a half-written file
+    prom_path = os.path.join(report_dir, PROMETHEUS_FILE.format(run_name=run_name))
+    tmp_path = f"{prom_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as out:
+        out.write(to_prometheus(report, run_name))
+    os.replace(tmp_path, prom_path)
+
+    print(f"Metrics written to {json_path} and {prom_path}")
+    return json_path
@@ -0,0 +1,172 @@
+import os
+import argparse
+from functools import lru_cache
+
+import numpy as np
+import yaml
+import spacy
+import spacy.cli
+
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+HUGGINGFACE_MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+SPACY_MODEL_NAME = "en_core_web_sm"
+
+EMBEDDING_CONFIG = os.path.join("config", "embedding.yaml")
+ONNX_MODEL_FILE = "model.int8.onnx"
+ONNX_UNQUANTIZED_FILE = "model.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+MAX_SEQUENCE_LENGTH = 256  # same truncation as the SentenceTransformer model
+DEFAULT_ONNX_DIR = os.path.join("models", f"{EMBEDDING_MODEL_NAME}-onnx")
+
+
+def load_embedding_config():
+    config = {"backend": "torch", "onnx": {}}
+    if os.path.exists(EMBEDDING_CONFIG):
+        with open(EMBEDDING_CONFIG, "r") as f:
+            config.update(yaml.safe_load(f) or {})
+    # handy for trying the other backend without editing the config
+    config["backend"] = os.environ.get("AUTONEWS_EMBEDDER", config["backend"])
+    return config
+
+
+class OnnxEmbedder:
+    """
+    all-MiniLM-L6-v2 exported to ONNX with int8 weights, run with onnxruntime on the CPU.
+    encode() mirrors SentenceTransformer.encode: mean pooling over the attention mask and
+    L2 normalisation, returning one vector for a string and a matrix for a list.
+    Neither torch nor sentence_transformers is imported.
+    """
+
+    def __init__(self, model_dir, threads=0):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQUENCE_LENGTH)
+        self.tokenizer.enable_padding()
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, ONNX_MODEL_FILE), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def encode(self, sentences, batch_size=32):
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            encodings = self.tokenizer.encode_batch(sentences[start:start + batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                inputs["token_type_ids"] = np.zeros_like(input_ids)
+
+            token_embeddings = self.session.run(None, inputs)[0]
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled / np.linalg.norm(pooled, axis=1, keepdims=True))
+
+        embeddings = np.concatenate(batches) if batches else np.zeros((0, 0), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+
+def export_onnx_model(model_dir, quantize=True):
+    """Exports the transformer to ONNX and quantizes it to dynamic int8 (needs requirements-export.txt)."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    os.makedirs(model_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(HUGGINGFACE_MODEL_NAME)
+    model = AutoModel.from_pretrained(HUGGINGFACE_MODEL_NAME)
+    model.eval()
+
+    sample = tokenizer(["An example headline"], return_tensors="pt")
+    unquantized_path = os.path.join(model_dir, ONNX_UNQUANTIZED_FILE)
+    dynamic_axes = {"input_ids": {0: "batch", 1: "sequence"}, "attention_mask": {0: "batch", 1: "sequence"},
+                    "token_type_ids": {0: "batch", 1: "sequence"}, "last_hidden_state": {0: "batch", 1: "sequence"}}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+            unquantized_path,
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+
+    model_path = os.path.join(model_dir, ONNX_MODEL_FILE)
+    if quantize:
+        quantize_dynamic(unquantized_path, model_path, weight_type=QuantType.QInt8)
+    else:
+        os.replace(unquantized_path, model_path)
+    tokenizer.backend_tokenizer.save(os.path.join(model_dir, TOKENIZER_FILE))
+
+    print(f"Exported {HUGGINGFACE_MODEL_NAME} to {model_path}")
+    return model_path
+
+
+def load_onnx_embedder(onnx_config):
+    model_dir = onnx_config.get("model_dir", DEFAULT_ONNX_DIR)
+    if not os.path.exists(os.path.join(model_dir, ONNX_MODEL_FILE)):
+        print(f"No ONNX model found in {model_dir}, exporting it...")
+        try:
+            export_onnx_model(model_dir, quantize=onnx_config.get("quantize", True))
+        except ImportError as e:
+            # ONNX-only hosts (requirements-onnx.txt) have no torch to export with
+            raise RuntimeError(
+                f"No ONNX model in {model_dir} and it can't be exported here ({e}). Run "
+                f"`python3 src/Models.py --export` where requirements-export.txt is installed "
+                f"and copy {model_dir} over."
+            ) from e
+    return OnnxEmbedder(model_dir, threads=onnx_config.get("threads", 0))
+
+
+def load_torch_embedder():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+
+# Loaded once per process, so stages running in the same process share one copy of each model
+@lru_cache(maxsize=None)
+def get_embedding_model():
+    config = load_embedding_config()
+    if config["backend"] == "onnx":
+        return load_onnx_embedder(config.get("onnx") or {})
+    if config["backend"] != "torch":
+        raise ValueError(f"Unknown embedding backend '{config['backend']}' (expected 'torch' or 'onnx')")
+    return load_torch_embedder()
+
+
+@lru_cache(maxsize=None)
+def get_nlp():
+    try:
+        return spacy.load(SPACY_MODEL_NAME)
+    except OSError:
+        # Load the spaCy English model, downloading it on first use
+        spacy.cli.download(SPACY_MODEL_NAME)
+        return spacy.load(SPACY_MODEL_NAME)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Export the embedding model for the ONNX backend")
+    parser.add_argument("--export", action="store_true", help="Export and quantize the ONNX model configured in config/embedding.yaml")
+    parser.add_argument("--no-quantize", action="store_true", help="Keep float32 weights")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    if args.export:
+        onnx_config = load_embedding_config().get("onnx") or {}
+        export_onnx_model(
+            onnx_config.get("model_dir", DEFAULT_ONNX_DIR),
+            quantize=not args.no_quantize,
+        )
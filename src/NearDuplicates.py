@@ -0,0 +1,235 @@
+import re
+import sqlite3
+import hashlib
+import argparse
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+
+MIN_JACCARD = 0.8  # word-set overlap from which two titles count as the same headline
+MINHASH_PERMUTATIONS = 64
+BAND_ROWS = 4  # 16 bands of 4: pairs at the threshold share a band with ~99.5% probability
+BANDS = MINHASH_PERMUTATIONS // BAND_ROWS
+MERSENNE_PRIME = (1 << 61) - 1
+
+# Outlet suffixes syndicated copies get, e.g. "Fed holds rates steady - AP News" or "... | Reuters"
+OUTLET_SUFFIX = re.compile(r"\s+[-|–—]\s+[^-|–—]{1,40}$")
+# Wire and label prefixes and suffixes, e.g. "AP: ...", "EXCLUSIVE - ...", "...: report"
+LABEL_PREFIX = re.compile(r"^(?:ap|reuters|afp|breaking|exclusive|update|updated|report|analysis|live)\s*[:\-–—|]\s*", re.IGNORECASE)
+LABEL_SUFFIX = re.compile(r"\s*[:\-–—|]\s*(?:report|reports|sources|source says|ap|reuters)$", re.IGNORECASE)
+POSSESSIVE = re.compile(r"['’]s\b", re.IGNORECASE)
+ABBREVIATION = re.compile(r"\b(?:[a-z]\.){2,}", re.IGNORECASE)  # U.S., U.K., U.N.
+ARTICLES = {"a", "an", "the"}
+
+Fingerprint = namedtuple("Fingerprint", ["words", "key_words", "signature"])
+
+"""
+Finds syndicated copies of the same story (the same AP headline across several outlets)
+before they are embedded.
+
+Match rule: titles are normalized (outlet suffixes, "AP:"/"Report:"-style labels,
+possessives, dots in abbreviations, punctuation and a/an/the removed, lowercased) to a
+set of words, and two titles are the same headline when
+  - the Jaccard similarity of their word sets is at least MIN_JACCARD, and
+  - they don't each have a key word the other lacks. Key words are numbers and, in
+    sentence-case titles, capitalized words after the first, so "Storm hits Texas" and
+    "Storm hits Florida" or two different scores stay apart, while an added "US" or
+    a reworded verb don't.
+That tolerates one changed word in a headline of nine or more words, or an added word
+in one of four or more.
+
+Lookups use MinHash signatures split into bands, so a title is only compared against
+stored titles sharing a band instead of every stored title; candidates are then checked
+with the exact Jaccard similarity.
+
+    python3 src/NearDuplicates.py --review database/autonews.db
+
+lists stored title pairs close to the threshold, to check it against real headlines.
+
+A copy only counts towards syndication_count when it comes from an outlet (link host)
+the story hasn't been seen from yet; its link is kept in article_links so the story can
+still be matched to that outlet when scraping one article per source.
+"""
+
+
+def _strip_labels(title):
+    title = OUTLET_SUFFIX.sub("", title.strip())
+    title = LABEL_PREFIX.sub("", title)
+    title = LABEL_SUFFIX.sub("", title)
+    title = POSSESSIVE.sub("", title)
+    title = ABBREVIATION.sub(lambda match: match.group(0).replace(".", ""), title)
+    return re.sub(r"[^\w\s]", " ", title)
+
+
+def normalize_title(title):
+    return " ".join(_strip_labels(title).lower().split())
+
+
+def title_words(title):
+    return frozenset(word for word in normalize_title(title).split() if word not in ARTICLES)
+
+
+def key_words(title):
+    tokens = _strip_labels(title).split()
+    # in Title Case headlines capitals say nothing, so only numbers are key there
+    sentence_case = sum(token[0].isupper() for token in tokens[1:]) <= len(tokens[1:]) / 2
+    return frozenset(
+        token.lower() for position, token in enumerate(tokens)
+        if any(char.isdigit() for char in token) or (sentence_case and position > 0 and token[0].isupper())
+    )
+
+
+def _hash_word(word):
+    return int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+# fixed (a, b) pairs of the hash family a * x + b mod p, one per permutation
+_PERMUTATIONS = [
+    (_hash_word(f"a{i}") % (MERSENNE_PRIME - 1) + 1, _hash_word(f"b{i}") % MERSENNE_PRIME)
+    for i in range(MINHASH_PERMUTATIONS)
+]
+
+
+def minhash(words):
+    hashes = [_hash_word(word) for word in words]
+    return tuple(min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def fingerprint(title):
+    """Returns the title's Fingerprint, or None if nothing is left of it after normalizing."""
+    words = title_words(title)
+    if not words:
+        return None
+    return Fingerprint(words, key_words(title), minhash(words))
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b)
+
+
+def key_words_swapped(first, second):
+    """True if each fingerprint has a key word missing from the other title (Texas vs Florida)."""
+    return bool(first.key_words - second.words) and bool(second.key_words - first.words)
+
+
+class DuplicateIndex:
+    def __init__(self):
+        self.bands = [{} for _ in range(BANDS)]
+        self.fingerprints = {}
+
+    def _band_keys(self, signature):
+        return [signature[band * BAND_ROWS:(band + 1) * BAND_ROWS] for band in range(BANDS)]
+
+    def add(self, article_id, title_fingerprint):
+        if title_fingerprint is None:
+            return
+        self.fingerprints[article_id] = title_fingerprint
+        for band, key in zip(self.bands, self._band_keys(title_fingerprint.signature)):
+            band.setdefault(key, []).append(article_id)
+
+    def find(self, title_fingerprint):
+        """Returns the id of the most similar stored article at or above MIN_JACCARD, or None."""
+        if title_fingerprint is None:
+            return None
+        candidates = set()
+        for band, key in zip(self.bands, self._band_keys(title_fingerprint.signature)):
+            candidates.update(band.get(key, ()))
+
+        best_id = None
+        best_similarity = MIN_JACCARD
+        for article_id in candidates:
+            stored = self.fingerprints[article_id]
+            similarity = jaccard(title_fingerprint.words, stored.words)
+            if similarity >= best_similarity and not key_words_swapped(title_fingerprint, stored):
+                best_id, best_similarity = article_id, similarity
+        return best_id
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    @classmethod
+    def from_database(cls, db_path='database/autonews.db'):
+        index = cls()
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, title FROM articles')
+        for article_id, title in cursor.fetchall():
+            index.add(article_id, fingerprint(title))
+        conn.close()
+        return index
+
+
+def link_host(link):
+    host = (urlsplit(link).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def record_syndication(article_id, link, db_path='database/autonews.db'):
+    """
+    Records link as a syndicated copy of article_id. Returns True if it came from a new
+    outlet and was counted; copies from the outlet of the stored link, or from an outlet
+    already recorded (the same story in a later run or in a second feed), are not.
+    """
+    host = link_host(link)
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute('SELECT link FROM articles WHERE id = ?', (article_id,)).fetchone()
+        if row is None or link_host(row[0]) == host:
+            return False
+
+        cursor = conn.execute(
+            'INSERT OR IGNORE INTO article_links (article_id, link, host) VALUES (?, ?, ?)',
+            (article_id, link, host),
+        )
+        if not cursor.rowcount:
+            return False
+        conn.execute('UPDATE articles SET syndication_count = syndication_count + 1 WHERE id = ?', (article_id,))
+        conn.commit()
+        return True
+    finally:
+        conn.close()
+
+
+def is_duplicate(first_title, second_title):
+    first, second = fingerprint(first_title), fingerprint(second_title)
+    if first is None or second is None:
+        return False
+    return jaccard(first.words, second.words) >= MIN_JACCARD and not key_words_swapped(first, second)
+
+
+def review_pairs(db_path, low=MIN_JACCARD - 0.2, high=1.0):
+    """
+    Returns (similarity, duplicate, title, title) for stored titles with low <= similarity < high,
+    closest to the threshold first. Compares every pair, so it is meant for a one-off check.
+    """
+    conn = sqlite3.connect(db_path)
+    titles = [row[0] for row in conn.execute('SELECT title FROM articles')]
+    conn.close()
+
+    fingerprints = [fingerprint(title) for title in titles]
+    pairs = []
+    for i in range(len(titles)):
+        for j in range(i + 1, len(titles)):
+            first, second = fingerprints[i], fingerprints[j]
+            if first is None or second is None:
+                continue
+            similarity = jaccard(first.words, second.words)
+            if low <= similarity < high:
+                duplicate = similarity >= MIN_JACCARD and not key_words_swapped(first, second)
+                pairs.append((similarity, duplicate, titles[i], titles[j]))
+    return sorted(pairs, key=lambda pair: abs(pair[0] - MIN_JACCARD))
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Inspect the near-duplicate title matching")
+    parser.add_argument("--review", metavar="DB", help="List stored title pairs near the MIN_JACCARD threshold")
+    parser.add_argument("--limit", type=int, default=50, help="Pairs to list")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    if args.review:
+        for similarity, duplicate, first, second in review_pairs(args.review)[:args.limit]:
+            verdict = "same" if duplicate else "diff"
+            print(f"{similarity:.2f} {verdict}  {first}\n           {second}")
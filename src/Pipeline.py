@@ -0,0 +1,240 @@
+import os
+import json
+import shutil
+import sqlite3
+import argparse
+import threading
+from queue import Queue
+from datetime import datetime
+
+import ArticleIngest
+import AudioCreator
+import Metrics
+import ScrapeArticle
+from Categories import DEFAULT_CATEGORY, get_category
+from GoogleFormsUpdater import createClusters
+from ScriptCreator import ScriptCreator
+
+
+SCRAPED_DIR = ScrapeArticle.OUTPUT_DIR
+SCRIPTS_DIR = "generated_scripts"
+
+# Small bounded queues so a fast stage never runs far ahead of a slow one
+QUEUE_SIZE = 2
+
+"""
+Runs ingest -> clustering -> scraping -> script generation -> TTS in one process.
+Ingest and clustering run once over the whole feed set; after that every topic is a
+segment that flows through its own scrape, script and audio stage as soon as the
+previous stage is done with it, so the first segment is playable while later ones
+are still being scraped.
+
+Each segment's progress (clustered -> scraped -> scripted -> voiced) is checkpointed in
+the pipeline_checkpoints table, so --resume picks up where an interrupted run stopped.
+
+With --skip-ingest the feed sweep is left out and clustering runs straight on the
+database IngestDaemon keeps up to date, so stories it picked up since its last poll
+reach clustering without waiting for a full sweep.
+
+A run covers one category from config/categories.yaml: its feeds, its database (which
+also holds its checkpoints), its filter rules, its sources and its broadcast folder.
+"""
+
+
+def create_checkpoint_table(db_path):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pipeline_checkpoints (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            topic TEXT NOT NULL UNIQUE,
+            stage TEXT NOT NULL,
+            artifact TEXT,
+            updated_at TEXT
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def clear_checkpoints(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute('DELETE FROM pipeline_checkpoints')
+    conn.commit()
+    conn.close()
+
+
+def save_checkpoint(db_path, topic, stage, artifact=None):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute('''
+        INSERT INTO pipeline_checkpoints (topic, stage, artifact, updated_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(topic) DO UPDATE SET stage = excluded.stage, artifact = excluded.artifact, updated_at = excluded.updated_at
+    ''', (topic, stage, artifact, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    conn.commit()
+    conn.close()
+
+
+def load_checkpoints(db_path):
+    """Returns the segments of the last run in cluster order as dicts of topic, stage and artifact."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute('SELECT topic, stage, artifact FROM pipeline_checkpoints ORDER BY id')
+    rows = cursor.fetchall()
+    conn.close()
+    return [{"topic": topic, "stage": stage, "artifact": artifact} for topic, stage, artifact in rows]
+
+
+def output_dirs(category):
+    # per category, so runs for different show types never clear each other's files
+    return os.path.join(SCRAPED_DIR, category["name"]), os.path.join(SCRIPTS_DIR, category["name"])
+
+
+def reset_output_dirs(category):
+    for folder in output_dirs(category):
+        if os.path.exists(folder):
+            shutil.rmtree(folder)
+        os.makedirs(folder, exist_ok=True)
+
+
+def scrape_stage(segments, out_queue, category, threshold):
+    db_path = category["database"]
+    scraped_dir, _ = output_dirs(category)
+    try:
+        for segment in segments:
+            if segment["stage"] == "clustered":
+                print(f"[scrape] {segment['topic']}")
+                try:
+                    segment["artifact"] = ScrapeArticle.process_articles_for_sources(
+                        category["sources"], [segment["topic"]], scraped_dir,
+                        threshold=threshold, db_path=db_path, filters_path=category["filters"],
+                    )
+                except Exception as e:
+                    # stays checkpointed as clustered, so --resume retries it
+                    print(f"Error scraping articles for {segment['topic']}: {e}")
+                    Metrics.increment("pipeline_scrape_errors")
+                    continue
+                segment["stage"] = "scraped"
+                save_checkpoint(db_path, segment["topic"], segment["stage"], segment["artifact"])
+            out_queue.put(segment)
+    finally:
+        # always tell the next stage we're done, or it waits forever
+        out_queue.put(None)
+
+
+def script_stage(in_queue, out_queue, category, creator):
+    db_path = category["database"]
+    _, scripts_dir = output_dirs(category)
+    try:
+        while (segment := in_queue.get()) is not None:
+            if segment["stage"] == "scraped":
+                print(f"[script] {segment['topic']}")
+                try:
+                    script_path = creator.process_article(segment["artifact"], scripts_dir)
+                except Exception as e:
+                    print(f"Error generating script for {segment['topic']}: {e}")
+                    script_path = None
+
+                if script_path is None:
+                    # stays checkpointed as scraped, so --resume retries it
+                    continue
+                segment["artifact"] = script_path
+                segment["stage"] = "scripted"
+                save_checkpoint(db_path, segment["topic"], segment["stage"], segment["artifact"])
+            out_queue.put(segment)
+    finally:
+        out_queue.put(None)
+
+
+def audio_stage(in_queue, category, stitched, trim, batched):
+    while (segment := in_queue.get()) is not None:
+        if segment["stage"] != "scripted":
+            continue
+        print(f"[audio] {segment['topic']}")
+        try:
+            with open(segment["artifact"], "r") as file:
+                script = json.load(file)
+            metadata_path = AudioCreator.create_segment_audio(
+                script, stitched=stitched, trim=trim, batched=batched, output_folder=category["broadcast_dir"]
+            )
+        except Exception as e:
+            # a TTS error only loses this segment; keep the other segments going
+            print(f"Error generating audio for {segment['topic']}: {e}")
+            continue
+        save_checkpoint(category["database"], segment["topic"], "voiced", metadata_path)
+        Metrics.increment("pipeline_segments_voiced")
+        print(f"Segment ready: {metadata_path}")
+
+
+def run_pipeline(category_name=DEFAULT_CATEGORY, num_topics=5, resume=False, threshold=0.5, stitched=False, trim=False, batched=False, skip_ingest=False):
+    category = get_category(category_name)
+    db_path = category["database"]
+    ArticleIngest.create_db(db_path)
+    create_checkpoint_table(db_path)
+
+    segments = load_checkpoints(db_path) if resume else []
+    if segments:
+        print(f"Resuming {len(segments)} {category['name']} segments from checkpoints")
+    else:
+        reset_output_dirs(category)
+        clear_checkpoints(db_path)
+
+        if skip_ingest:
+            print(f"Skipping ingest, clustering the articles already in {db_path}")
+        else:
+            with Metrics.timer("pipeline_ingest"):
+                ArticleIngest.main([category["name"]])
+        for topic in createClusters(num_topics, db_path=db_path):
+            save_checkpoint(db_path, topic, "clustered")
+        segments = load_checkpoints(db_path)
+
+    # Loaded before the stages start so the Ollama check doesn't stall the queues
+    creator = ScriptCreator(config_filename="script_creator.yaml", verbose=Metrics.VERBOSE)
+    if not creator.is_ollama_running():
+        creator.start_ollama()
+
+    script_queue = Queue(maxsize=QUEUE_SIZE)
+    audio_queue = Queue(maxsize=QUEUE_SIZE)
+
+    stages = [
+        threading.Thread(target=scrape_stage, args=(segments, script_queue, category, threshold), name="scrape"),
+        threading.Thread(target=script_stage, args=(script_queue, audio_queue, category, creator), name="script"),
+        threading.Thread(target=audio_stage, args=(audio_queue, category, stitched, trim, batched), name="audio"),
+    ]
+    for stage in stages:
+        stage.start()
+    for stage in stages:
+        stage.join()
+
+    done = sum(1 for segment in load_checkpoints(db_path) if segment["stage"] == "voiced")
+    print(f"Pipeline finished: {done}/{len(segments)} {category['name']} segments voiced")
+    Metrics.write_report(run_name=f"pipeline-{category['name']}")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Run the whole AutoNews pipeline in one process")
+    parser.add_argument("--category", default=DEFAULT_CATEGORY, help="Feed category from config/categories.yaml (news, games, sports, ...)")
+    parser.add_argument("--num-topics", type=int, default=5, help="Number of topics (segments) to produce")
+    parser.add_argument("--skip-ingest", action="store_true", help="Cluster the database as it is (e.g. kept fresh by IngestDaemon) instead of sweeping the feeds first")
+    parser.add_argument("--resume", action="store_true", help="Continue the last run from its database checkpoints")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Cosine similarity threshold for matching articles to a topic")
+    parser.add_argument("--stitched", action="store_true", help="Write one stitched audio file per segment")
+    parser.add_argument("--trim-silence", action="store_true", help="Trim silence around each line")
+    parser.add_argument("--batched", action="store_true", help="Batch TTS requests per speaker with SSML marks")
+    parser.add_argument("--verbose", action="store_true", help="Print per-entry and per-line progress")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    Metrics.set_verbose(args.verbose or Metrics.VERBOSE)
+    run_pipeline(
+        category_name=args.category,
+        num_topics=args.num_topics,
+        resume=args.resume,
+        threshold=args.threshold,
+        stitched=args.stitched,
+        trim=args.trim_silence,
+        batched=args.batched,
+        skip_ingest=args.skip_ingest,
+    )
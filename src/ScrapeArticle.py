@@ -4,24 +4,32 @@ import re
 import sqlite3
 import requests
 from bs4 import BeautifulSoup
-import spacy
 
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
 import json
 
+import Metrics
+from Filters import FILTERS_CONFIG, get_filter_engine
 from GoogleFormsUpdater import createClusters
+from Models import get_embedding_model
 
 
-# Load spaCy's English model
-nlp = spacy.load("en_core_web_sm")
-
-model = SentenceTransformer('all-MiniLM-L6-v2')
-
 DATABASE_PATH = "database/autonews.db"
 OUTPUT_DIR = "scraped_articles"
 
+# Sources to pull one article each from; their skip words live in config/filters.yaml
+SOURCES = [
+    "apnews",
+    #"news.google",
+    "guardian",
+    "nbcnews",
+    "cnbc",
+    "abcnews",
+    "cbsnews",
+    "bbc",
+]
+
 
 
 def sanitize_filename(name):
@@ -30,15 +38,21 @@ def sanitize_filename(name):
     return name
 
 
-def fetch_top_article_by_embeddings(source_filter, selected_topic, threshold=0.5):
+@Metrics.timed("scrape_match_article")
+def fetch_top_article_by_embeddings(source_filter, selected_topic, threshold=0.5, db_path=DATABASE_PATH):
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
 
+        # syndicated copies collapsed at ingest keep their own link in article_links
         cursor.execute("""
             SELECT title, link, embedding FROM articles
             WHERE link LIKE ?
-        """, (f"%{source_filter}%",))
+            UNION ALL
+            SELECT articles.title, article_links.link, articles.embedding FROM article_links
+            JOIN articles ON articles.id = article_links.article_id
+            WHERE article_links.link LIKE ?
+        """, (f"%{source_filter}%", f"%{source_filter}%"))
         results = cursor.fetchall()
         conn.close()
 
@@ -46,7 +60,7 @@ def fetch_top_article_by_embeddings(source_filter, selected_topic, threshold=0.5
             print(f"No articles found for source '{source_filter}'.")
             return None
 
-        topic_embedding = model.encode(selected_topic).reshape(1, -1)
+        topic_embedding = get_embedding_model().encode(selected_topic).reshape(1, -1)
 
         best_article = None
         best_similarity = -1
@@ -73,16 +87,19 @@ def fetch_top_article_by_embeddings(source_filter, selected_topic, threshold=0.5
         return None
 
 
-def scrape_article(title, link, skip_words):
+def scrape_article(title, link, filters_path=FILTERS_CONFIG):
     """Scrapes the article content from the given link, skipping unwanted titles."""
     try:
-        if any(word in title for word in skip_words):
-            print(f"Skipping article due to title containing skip words: {title}\n")
+        rule = get_filter_engine(filters_path).check(title, link)
+        if rule:
+            print(f"Skipping article due to filter rule {rule}: {title}\n")
             return None
 
-        response = requests.get(link)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
+        with Metrics.timer("scrape_fetch_page"):
+            response = requests.get(link)
+            response.raise_for_status()
+            soup = BeautifulSoup(response.text, "html.parser")
+        Metrics.increment("scrape_pages_fetched")
 
         paragraphs = soup.find_all("p")
         content = "\n".join([p.get_text() for p in paragraphs if p.get_text()])
@@ -91,10 +108,11 @@ def scrape_article(title, link, skip_words):
         return content, link
     except Exception as e:
         print(f"Error scraping {link}: {e}")
+        Metrics.increment("scrape_errors")
         return None
     
 
-def process_articles_for_sources(sources, topics, output_dir, threshold=0.5):
+def process_articles_for_sources(sources, topics, output_dir, threshold=0.5, db_path=DATABASE_PATH, filters_path=FILTERS_CONFIG):
     """Processes one article per source based on topic matches and aggregates them into a single file."""
     # Generate the output file name based on topics
     file_name = "_".join(topics) + ".txt"
@@ -103,16 +121,16 @@ def process_articles_for_sources(sources, topics, output_dir, threshold=0.5):
 
     aggregated_content = []
 
-    for source, skip_words in sources.items():
+    for source in sources:
         print(f"Processing articles for source: {source}")
 
-        article = fetch_top_article_by_embeddings(source_filter=source, selected_topic=topics[0], threshold=threshold)
+        article = fetch_top_article_by_embeddings(source_filter=source, selected_topic=topics[0], threshold=threshold, db_path=db_path)
         if not article:
             print(f"No articles found for source: {source}")
             continue
 
         print(f"Scraping: {article['title']}")
-        result = scrape_article(article["title"], article["link"], skip_words)
+        result = scrape_article(article["title"], article["link"], filters_path)
         if result:  # Only proceed if scrape_article returns valid content
             content, link = result
             aggregated_content.append(f"Source: {source}\nTitle: {article['title']}\nLink: {link}\n\n{content}\n{'-'*80}")
@@ -122,21 +140,10 @@ def process_articles_for_sources(sources, topics, output_dir, threshold=0.5):
 
     print(f"Aggregated content written to {output_file}")
     print("\n")
+    return output_file
 
 
 if __name__ == "__main__":
-    # Define sources and their respective skip words
-    sources = {
-        "apnews": ["Video", "Watch"],
-        #"news.google": ["Video", "Watch"],
-        "guardian": ["Video", "Watch"],
-        "nbcnews": ["Video", "Watch"],
-        "cnbc": ["Video", "Watch"],
-        "abcnews": ["Video", "Watch"],
-        "cbsnews": ["Watch CBS", "Daily Report", "24/7", "CBS", "Here Comes the Sun"],
-        "bbc": ["Video", "Watch"],
-    }
-
     topics = createClusters(5)
 
     cosine_similarity_threshold = 0.5
@@ -147,4 +154,6 @@ if __name__ == "__main__":
 
     for selected_topic in topics:
         print(f"Selected Topic: {selected_topic}")
-        process_articles_for_sources(sources, [selected_topic], OUTPUT_DIR, threshold=cosine_similarity_threshold)
+        process_articles_for_sources(SOURCES, [selected_topic], OUTPUT_DIR, threshold=cosine_similarity_threshold)
+
+    Metrics.write_report(run_name="scrape")
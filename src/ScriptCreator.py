@@ -15,6 +15,8 @@ from langchain_core.output_parsers import JsonOutputParser
 from langchain.output_parsers import OutputFixingParser
 from langchain_core.exceptions import OutputParserException
 
+import Metrics
+
 
 # Define the expected Pydantic structure of the news script
 class DialogueLine(BaseModel):
@@ -180,12 +182,17 @@ class ScriptCreator:
         response_stream = self.model.stream(formatted_prompt)
         script_output = ""
 
-        for chunk in response_stream:
-            print(chunk.content, end="", flush=True) 
-            script_output += chunk.content
+        with Metrics.timer("script_llm_generate"):
+            for chunk in response_stream:
+                if self.verbose:
+                    print(chunk.content, end="", flush=True)
+                script_output += chunk.content
+                Metrics.increment("script_llm_chunks")
+        Metrics.increment("script_llm_output_chars", len(script_output))
 
         try:
-            parsed_output = self.fixing_parser.parse(script_output)
+            with Metrics.timer("script_parse"):
+                parsed_output = self.fixing_parser.parse(script_output)
 
             if parsed_output is None:
                 print("Parsing returned None. Skipping this article.")
@@ -215,6 +222,7 @@ class ScriptCreator:
 
         except OutputParserException as e:
             print(f"Parsing failed: {e}")
+            Metrics.increment("script_parse_failures")
             return None
 
     
@@ -250,15 +258,20 @@ class ScriptCreator:
 
         for filename in os.listdir(input_folder):
             if filename.endswith('.txt'):
-                file_path = os.path.join(input_folder, filename)
-                article_text = self.load_article(file_path)
+                self.process_article(os.path.join(input_folder, filename), output_folder)
+
+    def process_article(self, file_path, output_folder='generated_scripts'):
+        """Generates the script for one scraped article file, returning its path or None if generation failed."""
+        filename = os.path.basename(file_path)
+        article_text = self.load_article(file_path)
 
-                print(f"Processing {filename}...")
-                script_data = self.generate_script(article_text)
+        print(f"Processing {filename}...")
+        script_data = self.generate_script(article_text)
 
-                output_filename = filename.replace('.txt', '.json')
-                output_path = os.path.join(output_folder, output_filename)
-                self.save_script(script_data, output_path)
+        output_filename = filename.replace('.txt', '.json')
+        output_path = os.path.join(output_folder, output_filename)
+        self.save_script(script_data, output_path)
+        return output_path if script_data is not None else None
 
 def parse_arguments():
     parser = argparse.ArgumentParser()
@@ -273,4 +286,5 @@ if __name__ == "__main__":
         shutil.rmtree(OUTPUT_DIR)
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     creator = ScriptCreator(config_filename="script_creator.yaml", verbose=args.verbose)
-    creator.process_articles()
\ No newline at end of file
+    creator.process_articles()
+    Metrics.write_report(run_name="script")
\ No newline at end of file